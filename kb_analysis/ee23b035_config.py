@@ -1,5 +1,6 @@
 from typing import Dict, Union, List, Tuple
 
+import numpy as np
 import matplotlib as mpl
 from PIL import ImageFont
 
@@ -32,5 +33,10 @@ KEY_FONT = ImageFont.truetype("arial.ttf", KEY_FONT_SIZE)
 G_WIDTH = 3.5
 # Size of gaussian array - larger = more spread
 K_PRESS_HMAP_W = 200
+# Key press gaussian
+# This will be superimposed on the heat map whenever a key is pressed
+_x = np.linspace(-G_WIDTH, G_WIDTH, K_PRESS_HMAP_W)
+_r_sq = np.add.outer(_x * _x, _x * _x)
+KEY_PRESS_MATRIX = (np.exp(-_r_sq / 2) / (2 * np.pi)).astype(np.float32)
 # Color gradient to use for heat map
 CMAP = mpl.colormaps["rainbow"]
@@ -22,8 +22,13 @@ def first_and_last_keys(
         List[Position]: List of keys in between the first and last
     """
     # Calculate first, last and middle keys based on x-coordinate
-    first_key = min(row.values(), key=lambda tup: tup[0])[0]
-    last_key = max(row.values(), key=lambda tup: tup[0])[0]
+    first_key = last_key = next(iter(row.values()))[0]
+    for pos in row.values():
+        if pos[0] < first_key:
+            first_key = pos[0]
+        if pos[0] > last_key:
+            last_key = pos[0]
+
     middle_keys = sorted(
         pos[0] for pos in row.values() if pos[0] not in (first_key, last_key)
     )
@@ -104,6 +109,9 @@ def draw_keyboard(kb_rows: List[Dict[str, Position]], painter: ImageDraw) -> Non
         # Extract first, last and middle keys
         first_key, last_key, middle_keys = first_and_last_keys(row)
 
+        # Map of x-coordinate -> key name, to look up the keys to draw
+        x_to_name = {pos[0]: name for name, pos in row.items()}
+
         # Calculate key width for non-first or last keys
         EFF_KEY_W = KB_W
         KEY_W = 0
@@ -118,7 +126,7 @@ def draw_keyboard(kb_rows: List[Dict[str, Position]], painter: ImageDraw) -> Non
         OFFSET = (KB_W - EFF_KB_W) / 2
 
         # Draw first key
-        key_name = [key for key in row if row[key][0] == first_key][0]
+        key_name = x_to_name[first_key]
         key_center_map[key_name] = draw_key(
             key_name[:2],  # Only show first two letters to prevent overflow
             (1, cum_height + 1),
@@ -139,7 +147,7 @@ def draw_keyboard(kb_rows: List[Dict[str, Position]], painter: ImageDraw) -> Non
                 * (non_first_keys[i + 1] - non_first_keys[i])
                 / (last_key - middle_keys[0])
             )
-            key_name = [key for key in row if row[key][0] == middle_keys[i]][0]
+            key_name = x_to_name[middle_keys[i]]
             key_center_map[key_name] = draw_key(
                 key_name.upper(),
                 (cum_width + 1, cum_height + 1),
@@ -150,7 +158,7 @@ def draw_keyboard(kb_rows: List[Dict[str, Position]], painter: ImageDraw) -> Non
             cum_width += KEY_W
 
         # Draw last key
-        key_name = [key for key in row if row[key][0] == last_key][0]
+        key_name = x_to_name[last_key]
         key_center_map[key_name] = draw_key(
             key_name[:2],  # Only show first two letters to prevent overflow
             (cum_width + 1, cum_height + 1),
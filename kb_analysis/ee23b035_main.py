@@ -1,3 +1,4 @@
+import math
 import argparse
 from typing import List, Tuple, Union
 
@@ -11,11 +12,11 @@ from ee23b035_draw import draw_keyboard
 from ee23b035_keyboard import REQUIRED_NORMAL_KEYS, REQUIRED_SPECIAL_KEYS
 
 from ee23b035_config import KB_LAYOUT, HOME_ROW_POS, KB_NAME
-from ee23b035_config import KB_W, KB_H, G_WIDTH, K_PRESS_HMAP_W, CMAP
+from ee23b035_config import KB_W, KB_H, K_PRESS_HMAP_W, KEY_PRESS_MATRIX, CMAP
 
 from ee23b035_utils import Position
 from ee23b035_utils import find_key_name, get_key_position
-from ee23b035_utils import generate_kb_rows, euclidean_dist
+from ee23b035_utils import generate_kb_rows, euclidean_dist, sq_dist
 
 
 def type_key(char: str) -> Tuple[List[str], float]:
@@ -42,14 +43,16 @@ def type_key(char: str) -> Tuple[List[str], float]:
     to_press = [find_key_name(char, KB_LAYOUT)]
 
     # Calculate the fastest way to type the key:
-    min_dist = euclidean_dist(HOME_ROW_POS[0], pos)
+    # Compare squared distances, and only take the sqrt of the closest one
+    min_sq = sq_dist(HOME_ROW_POS[0], pos)
     for idx, neutral_pos in enumerate(HOME_ROW_POS):
-        dist = euclidean_dist(neutral_pos, pos)
-        if dist < min_dist:
-            min_dist = dist
+        dist_sq = sq_dist(neutral_pos, pos)
+        if dist_sq < min_sq:
+            min_sq = dist_sq
             # idx < 4 -> key would be typed with left hand
             # idx >= 4 -> key would be typed with right hand
             KEY_LEFT = idx < 4
+    min_dist = math.sqrt(min_sq)
 
     # Account for distance to travel to shift key
     if USE_SHIFT:
@@ -88,16 +91,7 @@ def main(text: str, ignore_spaces: bool) -> float:
     # We will trim off the K_PRESS_HMAP_W later
     # This extra width and length is added so that the full
     # key_press matrix can always fit inside the heat_map matrix
-    heat_map = np.zeros((KB_H + K_PRESS_HMAP_W, KB_W + K_PRESS_HMAP_W))
-
-    # Generate key press gaussian
-    # This will be superimposed on heat_map whenever a key is pressed
-    x, y = np.meshgrid(
-        np.linspace(-G_WIDTH, G_WIDTH, K_PRESS_HMAP_W),
-        np.linspace(-G_WIDTH, G_WIDTH, K_PRESS_HMAP_W),
-    )
-    r_sq = x**2 + y**2
-    key_press_matrix = np.exp(-r_sq / 2) / (2 * 3.14159)
+    heat_map = np.zeros((KB_H + K_PRESS_HMAP_W, KB_W + K_PRESS_HMAP_W), dtype=np.float32)
 
     if ignore_spaces:
         text = text.replace(" ", "")
@@ -111,13 +105,15 @@ def main(text: str, ignore_spaces: bool) -> float:
         to_press, dist = type_key(char)
         travel_dist += dist
 
-        # Update the heat map
+        # Update the key press frequency
         for key_to_press in to_press:
             key_freq[key_to_press] += 1
 
-            x, y = key_center_map[key_to_press]
-            x, y = int(x), int(y)
-            heat_map[y : y + K_PRESS_HMAP_W, x : x + K_PRESS_HMAP_W] += key_press_matrix
+    # Update the heat map - once per key, scaled by the number of presses
+    for key, num_presses in key_freq.items():
+        x, y = key_center_map[key]
+        x, y = int(x), int(y)
+        heat_map[y : y + K_PRESS_HMAP_W, x : x + K_PRESS_HMAP_W] += num_presses * KEY_PRESS_MATRIX
 
     # PIL.Image to np.array (so we can do a superpose later on)
     img_array = np.array(image)
@@ -129,11 +125,12 @@ def main(text: str, ignore_spaces: bool) -> float:
     ]
     # Normalise from 0 - 1
     heat_map -= heat_map.min()
-    heat_map /= heat_map.max()
-    heat_map = CMAP(heat_map)[:, :, :3] * 255  # CMAP returns RGBA, we don't want the A
+    heat_map *= 1.0 / heat_map.max()
+    # CMAP returns RGBA, we don't want the A
+    heat_map = CMAP(heat_map, bytes=True)[:, :, :3]
 
     # Superimpose heatmap on top of keyboard
-    combined_img = img_array & heat_map.astype(np.uint8)
+    combined_img = np.bitwise_and(img_array, heat_map, out=img_array)
 
     # Show image with colorbar
     img_fig = plt.imshow(
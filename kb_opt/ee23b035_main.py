@@ -9,6 +9,7 @@ Script to implement simulated annealing on a keyboard layout.
 """
 
 import argparse
+from collections import Counter
 from typing import List, Tuple, Union
 
 import numpy as np
@@ -22,7 +23,7 @@ from ee23b035_keyboard import REQUIRED_NORMAL_KEYS, REQUIRED_SPECIAL_KEYS
 from ee23b035_simulated_annealing import simulated_annealing, cost_function
 
 from ee23b035_config import KB_LAYOUT, HOME_ROW_POS, KB_Type, TEMP
-from ee23b035_config import KB_W, KB_H, G_WIDTH, K_PRESS_HMAP_W, CMAP
+from ee23b035_config import KB_W, KB_H, K_PRESS_HMAP_W, KEY_PRESS_MATRIX, CMAP
 
 from ee23b035_utils import Position
 from ee23b035_utils import find_key_name, get_key_position
@@ -82,31 +83,25 @@ def main(text: str, KB_LAYOUT: KB_Type):
     # We will trim off the K_PRESS_HMAP_W later
     # This extra width and length is added so that the full
     # key_press matrix can always fit inside the heat_map matrix
-    heat_map = np.zeros((KB_H + K_PRESS_HMAP_W, KB_W + K_PRESS_HMAP_W))
-
-    # Generate key press gaussian
-    # This will be superimposed on heat_map whenever a key is pressed
-    x, y = np.meshgrid(
-        np.linspace(-G_WIDTH, G_WIDTH, K_PRESS_HMAP_W),
-        np.linspace(-G_WIDTH, G_WIDTH, K_PRESS_HMAP_W),
-    )
-    r_sq = x**2 + y**2
-    key_press_matrix = np.exp(-r_sq / 2) / (2 * 3.14159)
+    heat_map = np.zeros((KB_H + K_PRESS_HMAP_W, KB_W + K_PRESS_HMAP_W), dtype=np.float32)
 
     # Key press frequency mapping
     key_freq = {key: 0 for key in REQUIRED_NORMAL_KEYS | REQUIRED_SPECIAL_KEYS}
 
-    # Iteratively calculate travel distance
-    for char in text:
+    # Iteratively calculate key presses
+    # Keys to press only depend on the character - look them up once per unique character
+    for char, num_chars in Counter(text).items():
         to_press = type_key(char, KB_LAYOUT)
 
-        # Update the heat map
+        # Update the key press frequency
         for key_to_press in to_press:
-            key_freq[key_to_press] += 1
+            key_freq[key_to_press] += num_chars
 
-            x, y = key_center_map[key_to_press]
-            x, y = int(x), int(y)
-            heat_map[y : y + K_PRESS_HMAP_W, x : x + K_PRESS_HMAP_W] += key_press_matrix
+    # Update the heat map - once per key, scaled by the number of presses
+    for key, num_presses in key_freq.items():
+        x, y = key_center_map[key]
+        x, y = int(x), int(y)
+        heat_map[y : y + K_PRESS_HMAP_W, x : x + K_PRESS_HMAP_W] += num_presses * KEY_PRESS_MATRIX
 
     # PIL.Image to np.array (so we can do a superpose later on)
     img_array = np.array(image)
@@ -118,11 +113,12 @@ def main(text: str, KB_LAYOUT: KB_Type):
     ]
     # Normalise from 0 - 1
     heat_map -= heat_map.min()
-    heat_map /= heat_map.max()
-    heat_map = CMAP(heat_map)[:, :, :3] * 255  # CMAP returns RGBA, we don't want the A
+    heat_map *= 1.0 / heat_map.max()
+    # CMAP returns RGBA, we don't want the A
+    heat_map = CMAP(heat_map, bytes=True)[:, :, :3]
 
     # Superimpose heatmap on top of keyboard
-    combined_img = img_array & heat_map.astype(np.uint8)
+    combined_img = np.bitwise_and(img_array, heat_map, out=img_array)
 
     # Show image with colorbar
     img_fig = plt.imshow(
@@ -1,115 +1,347 @@
 from ee23b035_config import HOME_ROW_POS, KB_Type, KB_LAYOUT, T_MIN, ALPHA
 from ee23b035_keyboard import REQUIRED_NORMAL_KEYS, REQUIRED_SHIFT_KEYS
-from ee23b035_utils import get_key_position, find_key_name, euclidean_dist
+from ee23b035_utils import euclidean_dist, build_key_index
 
 import numpy as np
 
-import copy
 import math
 import random
-from typing import Tuple, Generator
+from typing import Dict, Tuple, Generator
 
-def cost_function(text: str, layout: KB_Type) -> float:
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional - without it, the vectorized NumPy cost function is used
+    njit = None
+    prange = range
+
+# Map special characters to the key names
+SPECIAL_CHARS = {" ": "Space", "\n": "Enter", "\t": "Tab", "\b": "Backspace"}
+
+# Home row positions as an array, for vectorized distance calculations
+HOME_ROW_ARR = np.array(HOME_ROW_POS, dtype=np.float32)
+
+# Minimum text length for which the cost is computed in parallel
+PARALLEL_COST_MIN_LEN = 10000
+
+# fastmath flags for the cost kernel - everything except "ninf" and "nnan", since
+# the early exit of the home row search depends on comparisons staying well defined
+COST_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+# Indices of the keys that can be swapped, see `build_layout_arrays()`
+# Regular keys are indexed first, followed by the shift keys
+NORMAL_KEYS_IDX = tuple(range(len(REQUIRED_NORMAL_KEYS)))
+SHIFT_KEYS_IDX = tuple(
+    range(len(REQUIRED_NORMAL_KEYS), len(REQUIRED_NORMAL_KEYS) + len(REQUIRED_SHIFT_KEYS))
+)
+
+
+def build_layout_arrays(
+    layout: KB_Type,
+) -> Tuple[Dict[str, int], np.ndarray, np.ndarray, np.ndarray]:
     """
-    Given a string, and a keyboard layout, calculate the travel distance.
-    This is our cost function for the simulated annealing.
+    Flatten a keyboard layout into arrays that can be used by the vectorized cost function.
+
+    Every character (and special key) is given an index. The regular keys come first,
+    followed by the shift keys and the rest of the keys, each sorted by character.
+    The indices do not change when keys are swapped in the layout.
 
     Args:
-        text (str): Input string to optimize keyboard for.
         layout (KB_Type): Keyboard layout
 
+    Returns:
+        Dict[str, int]: Mapping of character -> index
+        np.ndarray: (K, 2) array of key positions for each character
+        np.ndarray: (K,) boolean array, True if shift needs to be pressed for the character
+        np.ndarray: (2,) array of distance travelled to press shift, when the key
+            is typed with the left hand (Shift_R) and the right hand (Shift_L)
+    """
+    key_index = build_key_index(layout)
+    other_keys = key_index.keys() - REQUIRED_NORMAL_KEYS - REQUIRED_SHIFT_KEYS
+    idx_to_key = sorted(REQUIRED_NORMAL_KEYS) + sorted(REQUIRED_SHIFT_KEYS) + sorted(other_keys)
+    key_to_idx = {key: idx for idx, key in enumerate(idx_to_key)}
+
+    pos_arr = np.array([key_index[key][1] for key in key_to_idx], dtype=np.float32)
+    use_shift_mask = np.array([key_index[key][2] for key in key_to_idx], dtype=bool)
+
+    # Shift is typed with the hand opposite to the key
+    shift_travel = np.array(
+        [
+            euclidean_dist(HOME_ROW_POS[-1], key_index["Shift_R"][1]),
+            euclidean_dist(HOME_ROW_POS[0], key_index["Shift_L"][1]),
+        ],
+        dtype=np.float32,
+    )
+
+    return key_to_idx, pos_arr, use_shift_mask, shift_travel
+
+
+def apply_layout_arrays(
+    layout: KB_Type, key_to_idx: Dict[str, int], pos_arr: np.ndarray, use_shift_mask: np.ndarray
+):
+    """
+    Write the key positions from the layout arrays back into a keyboard layout.
+    Modifies the layout in place.
+
+    Args:
+        layout (KB_Type): Keyboard layout the arrays were built from
+        key_to_idx, pos_arr, use_shift_mask: Layout arrays, from `build_layout_arrays()`
+    """
+    # Mapping of (position, shift) -> key, for all keys that can be swapped
+    key_at = {
+        (tuple(pos_arr[idx]), bool(use_shift_mask[idx])): key
+        for key, idx in key_to_idx.items()
+        if key not in layout.get("special_keys", {})
+    }
+
+    for row in layout.values():
+        if row.get("keys") is None:
+            continue
+
+        # Use the same float32 representation as pos_arr, to be able to look up the keys
+        positions = [tuple(pos) for pos in np.array(row["positions"], dtype=np.float32)]
+        row["keys"] = "".join(key_at[(pos, False)] for pos in positions)
+        row["shiftkeys"] = "".join(key_at[(pos, True)] for pos in positions)
+
+
+def encode_text(text: str, key_to_idx: Dict[str, int]) -> np.ndarray:
+    """
+    Translate a string into an array of key indices.
+
+    Args:
+        text (str): Input string
+        key_to_idx (Dict[str, int]): Mapping of character -> index, from `build_layout_arrays()`
+
+    Returns:
+        np.ndarray: (N,) integer array of key indices
+
+    Raises:
+        ValueError if a character is not found in the layout
+    """
+    # Lookup table of unicode code point -> key index, -1 for characters not in the layout
+    char_to_idx = {key: idx for key, idx in key_to_idx.items() if len(key) == 1}
+    char_to_idx.update(
+        (char, key_to_idx[key]) for char, key in SPECIAL_CHARS.items() if key in key_to_idx
+    )
+    lookup = np.full(max(map(ord, char_to_idx)) + 1, -1, dtype=np.int32)
+    lookup[[ord(char) for char in char_to_idx]] = list(char_to_idx.values())
+
+    # Translate the whole string at once, without iterating over it in Python
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    char_idx = np.full(codes.shape, -1, dtype=np.int32)
+    in_table = codes < len(lookup)
+    char_idx[in_table] = lookup[codes[in_table]]
+
+    missing = np.flatnonzero(char_idx < 0)
+    if len(missing) != 0:
+        char = text[missing[0]]
+        raise ValueError(f"Key '{SPECIAL_CHARS.get(char, char)}' not found")
+
+    return char_idx
+
+
+def key_travel(
+    pos_arr: np.ndarray, use_shift_mask: np.ndarray, shift_travel: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the travel distance for a single press of each of the given keys.
+
+    Args:
+        pos_arr (np.ndarray): (N, 2) array of key positions
+        use_shift_mask (np.ndarray): (N,) boolean array, True if shift needs to be pressed
+        shift_travel (np.ndarray): Shift travel distances, from `build_layout_arrays()`
+
+    Returns:
+        np.ndarray: (N,) array of travel distances
+    """
+    # (N, 8) matrix of squared distances from every home row key to every typed key
+    # Only the closest home row key matters, so we take the sqrt after the argmin
+    sq_dists = ((HOME_ROW_ARR[None, :, :] - pos_arr[:, None, :]) ** 2).sum(-1)
+
+    # Calculate the fastest way to type each key
+    nearest_idx = sq_dists.argmin(1)
+    min_dist = np.sqrt(np.take_along_axis(sq_dists, nearest_idx[:, None], axis=1)[:, 0])
+
+    # idx < 4 -> key would be typed with left hand
+    # idx >= 4 -> key would be typed with right hand
+    key_right = nearest_idx >= len(HOME_ROW_POS) // 2
+
+    # Account for distance to travel to shift key
+    min_dist += use_shift_mask * shift_travel[key_right.astype(np.int8)]
+
+    return min_dist
+
+
+def _cost(
+    char_idx: np.ndarray,
+    pos_arr: np.ndarray,
+    home: np.ndarray,
+    use_shift_mask: np.ndarray,
+    shift_travel: np.ndarray,
+) -> float:
+    """
+    Loop version of `text_cost()`, meant to be compiled with numba.
+    Characters are independent of each other, so the loop can be run in parallel.
+
+    Args:
+        char_idx (np.ndarray): Encoded string, from `encode_text()`
+        pos_arr, use_shift_mask, shift_travel (np.ndarray): Layout arrays, from `build_layout_arrays()`
+        home (np.ndarray): (8, 2) array of home row positions
+
     Returns:
         float: Travel distance
     """
-    # Map special characters to the key names
-    special_chars = {" ": "Space", "\n": "Enter", "\t": "Tab", "\b": "Backspace"}
-    travel_dist = 0
-    
-    for char in text:
-        # If the given char is a special char, update the name
-        char = special_chars.get(char, char)
-
-        pos, USE_SHIFT = get_key_position(char, layout)
-        KEY_LEFT = True  # Indicate which side of the keyboard the key is on
-
-        # Calculate the fastest way to type the key:
-        min_dist = euclidean_dist(HOME_ROW_POS[0], pos)
-        for idx, neutral_pos in enumerate(HOME_ROW_POS):
-            dist = euclidean_dist(neutral_pos, pos)
-            if dist < min_dist:
-                min_dist = dist
-                # idx < 4 -> key would be typed with left hand
-                # idx >= 4 -> key would be typed with right hand
-                KEY_LEFT = idx < len(HOME_ROW_POS) // 2
+    num_left = home.shape[0] // 2
+    travel_dist = 0.0
+
+    for i in prange(char_idx.shape[0]):
+        key = char_idx[i]
+        x, y = pos_arr[key, 0], pos_arr[key, 1]
+
+        # Calculate the fastest way to type the key, using squared distances
+        # The home row is sorted by x - once a home row key is further away along x
+        # alone than the closest one so far, the rest of the keys can not be closer
+        # Start from the first home row key - no infinite sentinel, since fastmath
+        # lets the compiler assume that there are no infinities
+        min_sq = (home[0, 0] - x) ** 2 + (home[0, 1] - y) ** 2
+        nearest_idx = 0
+        for idx in range(1, home.shape[0]):
+            x_gap = home[idx, 0] - x
+            if x_gap > 0 and x_gap * x_gap > min_sq:
+                break
+
+            dist_sq = x_gap ** 2 + (home[idx, 1] - y) ** 2
+            if dist_sq < min_sq:
+                min_sq = dist_sq
+                nearest_idx = idx
+
+        min_dist = math.sqrt(min_sq)
 
         # Account for distance to travel to shift key
-        if USE_SHIFT:
-            if KEY_LEFT:
-                # If key is on left, type shift with right hand
-                shift_key = get_key_position("Shift_R", layout)[0]
-                min_dist += euclidean_dist(HOME_ROW_POS[-1], shift_key)
+        if use_shift_mask[key]:
+            if nearest_idx < num_left:
+                min_dist += shift_travel[0]
             else:
-                # If key is on right, type shift with left hand
-                shift_key = get_key_position("Shift_L", layout)[0]
-                min_dist += euclidean_dist(HOME_ROW_POS[0], shift_key)
+                min_dist += shift_travel[1]
 
         travel_dist += min_dist
-    
+
     return travel_dist
 
 
-def swap_keys(key_1: str, key_2: str, key_type: str, layout: KB_Type):
+if njit is not None:
+    # Not cached - numba keys its cache on the Python function and not the flags,
+    # so a cached parallel kernel would be loaded for the serial one, and vice versa
+    _cost_parallel = njit(parallel=True, fastmath=COST_FASTMATH)(_cost)
+    _cost = njit(fastmath=COST_FASTMATH, cache=True)(_cost)
+
+
+def text_cost(
+    char_idx: np.ndarray,
+    pos_arr: np.ndarray,
+    use_shift_mask: np.ndarray,
+    shift_travel: np.ndarray,
+) -> float:
+    """
+    Calculate the travel distance for an encoded string.
+
+    Args:
+        char_idx (np.ndarray): Encoded string, from `encode_text()`
+        pos_arr, use_shift_mask, shift_travel (np.ndarray): Layout arrays, from `build_layout_arrays()`
+
+    Returns:
+        float: Travel distance
     """
-    Swap the given keys in a keyboard layout. Modifies the layout in place.
+    if njit is not None:
+        # Threading overhead is not worth it for short texts
+        kernel = _cost_parallel if len(char_idx) >= PARALLEL_COST_MIN_LEN else _cost
+        return float(kernel(char_idx, pos_arr, HOME_ROW_ARR, use_shift_mask, shift_travel))
+
+    travel = key_travel(pos_arr[char_idx], use_shift_mask[char_idx], shift_travel)
+    return float(travel.sum(dtype=np.float64))
+
+
+def cost_function(text: str, layout: KB_Type) -> float:
+    """
+    Given a string, and a keyboard layout, calculate the travel distance.
+    This is our cost function for the simulated annealing.
 
     Args:
-        key_1, key_2 (str): Keys to swap
-        key_type (str): Type of the keys - shift or regular
+        text (str): Input string to optimize keyboard for.
         layout (KB_Type): Keyboard layout
+
+    Returns:
+        float: Travel distance
+    """
+    key_to_idx, pos_arr, use_shift_mask, shift_travel = build_layout_arrays(layout)
+    char_idx = encode_text(text, key_to_idx)
+
+    return text_cost(char_idx, pos_arr, use_shift_mask, shift_travel)
+
+
+def build_slot_arrays(
+    pos_arr: np.ndarray, shift_travel: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split the key positions into the physical key slots, and the slot each key is on.
+
+    Slots do not move when keys are swapped - only the key on each slot changes.
+    So the travel distance for pressing each slot only needs to be computed once.
+
+    Args:
+        pos_arr (np.ndarray): (K, 2) array of key positions, from `build_layout_arrays()`
+        shift_travel (np.ndarray): Shift travel distances, from `build_layout_arrays()`
+
+    Returns:
+        np.ndarray: (S, 2) array of slot positions
+        np.ndarray: (K,) array of the slot index of each key
+        np.ndarray: (2, S) array of travel distance for a single press of each slot,
+            without and with shift
     """
+    slot_pos, key_slot = np.unique(pos_arr, axis=0, return_inverse=True)
+    key_slot = key_slot.reshape(-1)
 
-    # Find position of the keys to swap
-    key_1_row, key_1_col = None, None
-    key_2_row, key_2_col = None, None
+    num_slots = len(slot_pos)
+    slot_travel = np.stack(
+        [
+            key_travel(slot_pos, np.zeros(num_slots, dtype=bool), shift_travel),
+            key_travel(slot_pos, np.ones(num_slots, dtype=bool), shift_travel),
+        ]
+    )
 
-    for row_name, row in layout.items():
-        if key_1 in row.get(key_type, []):
-            key_1_row = row_name
-            key_1_col = row.get(key_type, []).index(key_1)
-        if key_2 in row.get(key_type, []):
-            key_2_row = row_name
-            key_2_col = row.get(key_type, []).index(key_2)
+    return slot_pos, key_slot, slot_travel
 
-    # Perform the swap
-    layout[key_2_row][key_type] = layout[key_2_row][key_type][:key_2_col] \
-                                + key_1 \
-                                + layout[key_2_row][key_type][key_2_col + 1:]
-    
-    layout[key_1_row][key_type] = layout[key_1_row][key_type][:key_1_col] \
-                                + key_2 \
-                                + layout[key_1_row][key_type][key_1_col + 1:]
 
+def swap_keys(idx_1: int, idx_2: int, layout_arr: np.ndarray):
+    """
+    Swap the given keys in a layout array. Modifies the array in place.
 
-def swap_keys_random(layout: KB_Type) -> Tuple[str, str, str]:
+    Args:
+        idx_1, idx_2 (int): Indices of the keys to swap, from `build_layout_arrays()`
+        layout_arr (np.ndarray): Array indexed by key - key positions or key slots
     """
-    Swap two keys at random in a keyboard layout.
-    Modifies the given layout in place
+    layout_arr[[idx_1, idx_2]] = layout_arr[[idx_2, idx_1]]
+
+
+def swap_keys_random(layout_arr: np.ndarray) -> Tuple[int, int]:
+    """
+    Swap two keys at random in a layout array.
+    Modifies the given array in place
 
     Args:
-        layout: Keyboard layout
+        layout_arr (np.ndarray): Array indexed by key - key positions or key slots
 
     Returns:
-        Tuple[str, str, str]: The two keys swapped, and their type (shift or regular)
+        Tuple[int, int]: Indices of the two keys swapped
     """
     # Choose whether we want to swap regular or shift keys
-    key_type = random.choice(["keys", "shiftkeys"])
-    keys = REQUIRED_NORMAL_KEYS if key_type == "keys" else REQUIRED_SHIFT_KEYS
+    keys = NORMAL_KEYS_IDX if random.random() < 0.5 else SHIFT_KEYS_IDX
 
-    # Choose keys and swap
-    key_1, key_2 = random.choices(list(keys), k=2)
-    swap_keys(key_1, key_2, key_type, layout)
+    # Choose two distinct keys and swap
+    idx_1, idx_2 = random.sample(keys, 2)
+    swap_keys(idx_1, idx_2, layout_arr)
 
-    return key_1, key_2, key_type
+    return idx_1, idx_2
 
 
 def simulated_annealing(text: str, initial_temp: int, layout: KB_Type) -> Generator[float, float, int]:
@@ -129,9 +361,21 @@ def simulated_annealing(text: str, initial_temp: int, layout: KB_Type) -> Genera
     # Temperature variable
     TEMP = initial_temp
 
-    # Deep copy the layout - otherwise the global best will be updated everytime it updates
-    global_best = copy.deepcopy(layout)
-    global_min = cost_function(text, global_best)
+    # Translate the text only once - key indices do not change on swapping keys
+    key_to_idx, pos_arr, use_shift_mask, shift_travel = build_layout_arrays(layout)
+    char_idx = encode_text(text, key_to_idx)
+
+    # Travel per press of each slot is computed once - swaps only move keys between slots
+    slot_pos, key_slot, slot_travel = build_slot_arrays(pos_arr, shift_travel)
+
+    # The travel distance is the sum of (number of presses x travel per press) over all keys
+    # A swap only changes the travel per press of the two keys swapped
+    freq = np.bincount(char_idx, minlength=len(key_to_idx))
+    global_min = float(freq @ slot_travel[use_shift_mask.astype(np.int8), key_slot])
+
+    # Copy the slots - otherwise the global best will be updated everytime it updates
+    # Improvements are copied into this same buffer, without allocating a new one
+    global_best = key_slot.copy()
 
     # Initialise the cost variable
     cost = global_min
@@ -139,18 +383,24 @@ def simulated_annealing(text: str, initial_temp: int, layout: KB_Type) -> Genera
     while TEMP > T_MIN:
         # Perform a random swap and compute new cost function
         old_cost = cost
-        key_1, key_2, key_type = swap_keys_random(layout)
-        cost = cost_function(text, layout)
+        idx_1, idx_2 = swap_keys_random(key_slot)
+
+        # Both keys are of the same type, and have exchanged slots
+        travel = slot_travel[int(use_shift_mask[idx_1])]
+        cost = old_cost + float(
+            (freq[idx_1] - freq[idx_2]) * (travel[key_slot[idx_1]] - travel[key_slot[idx_2]])
+        )
         diff = cost - old_cost
 
         # Heuristically choose the new layout if it is worse than the current one
-        if not (random.random() < math.exp(-diff / TEMP) or diff < 0):
-            swap_keys(key_1, key_2, key_type, layout)
+        # Otherwise, undo the swap - only the two swapped slots need to be restored
+        if diff > 0 and random.random() >= math.exp(-diff / TEMP):
+            swap_keys(idx_1, idx_2, key_slot)
             cost = old_cost
 
         # Update the global minimum
         if cost < global_min:
-            global_best = copy.deepcopy(layout)
+            np.copyto(global_best, key_slot)
             global_min = cost
 
         # Decrement temperature and yield instantaneous costs
@@ -158,4 +408,4 @@ def simulated_annealing(text: str, initial_temp: int, layout: KB_Type) -> Genera
         yield global_min, cost, TEMP
 
     # Update the layout to be the global best
-    layout.update(global_best)
+    apply_layout_arrays(layout, key_to_idx, slot_pos[global_best], use_shift_mask)
@@ -1,5 +1,9 @@
 from PIL import ImageFont
 
+import numpy as np
+
+import copy
+import math
 from typing import Tuple, Union, Dict, List
 
 from ee23b035_keyboard import KB_Type
@@ -11,7 +15,22 @@ Position = Tuple[float, float]
 
 def euclidean_dist(pos1: Position, pos2: Position) -> float:
     """Calculate euclidean distance between two points."""
-    return ((pos2[0] - pos1[0]) ** 2 + (pos2[1] - pos1[1]) ** 2) ** 0.5
+    return math.sqrt((pos2[0] - pos1[0]) ** 2 + (pos2[1] - pos1[1]) ** 2)
+
+
+def euclidean_dists(arr1: np.ndarray, arr2: np.ndarray) -> np.ndarray:
+    """
+    Calculate euclidean distances between two arrays of points.
+
+    Args:
+        arr1 (np.ndarray): (..., 2) array of positions
+        arr2 (np.ndarray): (..., 2) array of positions, broadcastable against arr1
+
+    Returns:
+        np.ndarray: (...) array of distances
+    """
+    diff = np.subtract(arr2, arr1)
+    return np.sqrt(np.einsum("...i,...i->...", diff, diff))
 
 
 def generate_kb_rows(layout: KB_Type) -> List[Dict[str, Position]]:
@@ -28,25 +47,74 @@ def generate_kb_rows(layout: KB_Type) -> List[Dict[str, Position]]:
 
     # Populate list with non-special keys
     kb_rows = [
-        {row["keys"][idx]: row["positions"][idx] for idx in range(len(row["keys"]))}
-        for _, row in sorted(layout.items(), key=lambda t: t[0])
-        if row.get("keys", None) is not None
+        dict(zip(row["keys"], row["positions"]))
+        for _, row in sorted(layout.items())
+        if row.get("keys") is not None
     ]
 
     # Add special keys
     for key, pos in layout["special_keys"].items():
-        # If the row for this key exists, add it into the row
-        if pos[1] < len(kb_rows):
-            kb_rows[pos[1]][key] = pos
-        # Else, keep adding empty rows
-        else:
-            while pos[1] >= len(kb_rows):
-                kb_rows.append({})
-            kb_rows[pos[1]][key] = pos
+        # If the row for this key does not exist, add empty rows up to it
+        if pos[1] >= len(kb_rows):
+            kb_rows.extend({} for _ in range(pos[1] + 1 - len(kb_rows)))
+        kb_rows[pos[1]][key] = pos
 
     return kb_rows
 
 
+# Key index type - character -> (key name, key position, if shift needs to be pressed)
+KeyIndex = Dict[str, Tuple[str, Position, bool]]
+
+# Copy of the last layout that was looked up, and its key index, see `get_key_index()`
+_KEY_INDEX_CACHE: List[Tuple[KB_Type, KeyIndex]] = []
+
+
+def build_key_index(layout: KB_Type) -> KeyIndex:
+    """
+    Given a keyboard layout, map every character that can be typed to the
+    key that has to be pressed for it.
+
+    Args:
+        layout (KB_Type): Keyboard layout
+
+    Returns:
+        KeyIndex: Mapping of character -> (key name, key position, if shift needs to be pressed)
+    """
+    key_index: KeyIndex = {}
+
+    for row_name, row in layout.items():
+        if row_name == "special_keys":
+            for key, pos in row.items():
+                key_index.setdefault(key, (key, pos, False))
+        elif row.get("keys") is not None:
+            for key, shift_key, pos in zip(row["keys"], row["shiftkeys"], row["positions"]):
+                key_index.setdefault(key, (key, pos, False))
+                key_index.setdefault(shift_key, (key, pos, True))
+
+    return key_index
+
+
+def get_key_index(layout: KB_Type) -> KeyIndex:
+    """
+    Get the key index of a keyboard layout, rebuilding it only if the layout differs
+    from the last one that was looked up.
+    The layout is compared against a copy, so modifying it in place is picked up too.
+
+    Args:
+        layout (KB_Type): Keyboard layout
+
+    Returns:
+        KeyIndex: Key index from `build_key_index()`
+    """
+    if _KEY_INDEX_CACHE and _KEY_INDEX_CACHE[0][0] == layout:
+        return _KEY_INDEX_CACHE[0][1]
+
+    key_index = build_key_index(layout)
+    _KEY_INDEX_CACHE[:] = [(copy.deepcopy(layout), key_index)]
+
+    return key_index
+
+
 def find_key_name(key: str, layout: KB_Type) -> str:
     """
     Given a character to be typed, find the key name to be pressed
@@ -61,20 +129,13 @@ def find_key_name(key: str, layout: KB_Type) -> str:
     Raises:
         ValueError if the key is not found
     """
-    for row in layout.values():
-        if key in row.get("keys", []):
-            return key
-        elif key in row.get("shiftkeys", []):
-            index = row["shiftkeys"].index(key)
-            return row["keys"][index]
+    try:
+        return get_key_index(layout)[key][0]
+    except KeyError:
+        raise ValueError(f"Key '{key}' not found")
 
-    if key in layout.get("special_keys", []):
-        return key
 
-    raise ValueError(f"Key '{key}' not found")
-
-
-def get_key_position(key: str, layout: KB_Type) -> Tuple[str, bool]:
+def get_key_position(key: str, layout: KB_Type) -> Tuple[Position, bool]:
     """
     Given a character to be typed, find the key position
 
@@ -83,21 +144,15 @@ def get_key_position(key: str, layout: KB_Type) -> Tuple[str, bool]:
         layout (KB_Type): Keyboard Layout
 
     Returns:
-        str: Key name
+        Position: Key position
         bool: If shift needs to be pressed
 
     Raises:
         ValueError if the key is not found
     """
-    for row in layout.values():
-        if key in row.get("keys", []):
-            index = row["keys"].index(key)
-            return row["positions"][index], False
-        elif key in row.get("shiftkeys", []):
-            index = row["shiftkeys"].index(key)
-            return row["positions"][index], True
-
-    if key in layout.get("special_keys", []):
-        return layout["special_keys"][key], False
-
-    raise ValueError(f"Key '{key}' not found")
+    try:
+        _, pos, use_shift = get_key_index(layout)[key]
+    except KeyError:
+        raise ValueError(f"Key '{key}' not found")
+
+    return pos, use_shift
@@ -1,5 +1,7 @@
 from typing import List, Union, get_args
 
+import numpy as np
+
 # Numeric data type
 Numeric = Union[int, float, complex]
 
@@ -88,18 +90,27 @@ def matrix_multiply(
             raise error(message)
 
     # Final check to see if the matrices have compatible dimensions
-    if len(matrix1) != len(matrix2[0]):
+    if len(matrix1[0]) != len(matrix2):
         raise ValueError("Matrices cannot be multiplied")
 
-    # Transpose matrix2, now we're multiplying rows by rows (easier to index)
-    matrix2_transpose = [[row[i] for row in matrix2] for i in range(len(matrix2[0]))]
+    # Let NumPy (BLAS) do the actual multiplication
+    matrix1, matrix2 = np.asarray(matrix1), np.asarray(matrix2)
+
+    # Boolean matrices would be multiplied with logical and/or - promote them to integers
+    dtype = np.result_type(matrix1, matrix2, int)
+
+    # Fixed width integers would silently overflow, so unless every element of the
+    # product provably fits, multiply as Python ints (dtype=object) instead
+    if np.issubdtype(dtype, np.integer) and not _fits_int64(matrix1, matrix2):
+        dtype = object
+
+    return (matrix1.astype(dtype, copy=False) @ matrix2.astype(dtype, copy=False)).tolist()
 
-    # Placeholder matrix for the multiplication result
-    resultant_matrix = [[0] * len(matrix2_transpose) for j in range(len(matrix1))]
 
-    # Elementwise multiplication
-    for i in range(len(matrix1)):
-        for j in range(len(matrix2_transpose)):
-            resultant_matrix[i][j] = multiply(matrix1[i], matrix2_transpose[j])
+def _fits_int64(matrix1: np.ndarray, matrix2: np.ndarray) -> bool:
+    """Check if every sum of products in matrix1 @ matrix2 is guaranteed to fit in an int64."""
+    # Python ints, so that neither the bound nor abs(int64 min) can overflow
+    max_1 = max(int(matrix1.max()), -int(matrix1.min()))
+    max_2 = max(int(matrix2.max()), -int(matrix2.min()))
 
-    return resultant_matrix
+    return max_1 * max_2 * matrix1.shape[1] < 2**63
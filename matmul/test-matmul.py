@@ -14,6 +14,11 @@ class TestMatrixMultiplication(unittest.TestCase):
         expected_result = [[22, 28], [49, 64]]
         self.assertEqual(matrix_multiply(matrix1, matrix2), expected_result)
 
+    def test_big_integers(self):
+        self.assertEqual(matrix_multiply([[2**40]], [[2**40]]), [[2**80]])
+        self.assertEqual(matrix_multiply([[2**62, 2**62]], [[2], [2]]), [[2**64]])
+        self.assertEqual(matrix_multiply([[2**70, 1]], [[1], [-(2**70)]]), [[0]])
+
     def test_1x1_matrices(self):
         matrix1 = [[5]]
         matrix2 = [[10]]
@@ -26,6 +31,12 @@ class TestMatrixMultiplication(unittest.TestCase):
         with self.assertRaises(ValueError):
             matrix_multiply(matrix1, matrix2)
 
+    def test_incompatible_inner_dimensions(self):
+        matrix1 = [[1, 2, 3], [4, 5, 6]]
+        matrix2 = [[1, 2], [3, 4]]
+        with self.assertRaisesRegex(ValueError, "Matrices cannot be multiplied"):
+            matrix_multiply(matrix1, matrix2)
+
     def test_empty_matrix(self):
         matrix1 = []
         matrix2 = [[1, 2], [3, 4]]
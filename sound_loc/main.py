@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 
 Nmics = 64
@@ -26,8 +28,8 @@ def wsrc(t):
 wave = wsrc(t)
 
 def dist(src, pt, mic):
-    d1 = ((src[1] - pt[1]) ** 2 + (src[0] - pt[0]) ** 2) ** 0.5
-    d2 = ((mic[1] - pt[1]) ** 2 + (mic[0] - pt[0]) ** 2) ** 0.5
+    d1 = math.sqrt((src[1] - pt[1]) ** 2 + (src[0] - pt[0]) ** 2)
+    d2 = math.sqrt((mic[1] - pt[1]) ** 2 + (mic[0] - pt[0]) ** 2)
     return d1 + d2
 
 mic_output = np.zeros((Nmics, Nsamp))
@@ -1,5 +1,14 @@
+import math
+
 import numpy as np
 
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional - without it, the reconstruction is vectorized with NumPy
+    njit = None
+    prange = range
+
 Nmics = 64
 Nsamp = 200
 
@@ -14,10 +23,41 @@ mics = []
 obstacle = (3, -1)
 
 def dist(src, pt, mic):
-    d1 = ((src[1] - pt[1]) ** 2 + (src[0] - pt[0]) ** 2) ** 0.5
-    d2 = ((mic[1] - pt[1]) ** 2 + (mic[0] - pt[0]) ** 2) ** 0.5
+    d1 = math.sqrt((src[1] - pt[1]) ** 2 + (src[0] - pt[0]) ** 2)
+    d2 = math.sqrt((mic[1] - pt[1]) ** 2 + (mic[0] - pt[0]) ** 2)
     return d1 + d2
 
+
+if njit is not None:
+    # Compiled so that it can be called from the numba reconstruction kernel below
+    dist = njit(inline="always", cache=True)(dist)
+
+
+def reconstruct(mic_output, mic_x, mic_y, Nmics, Nsamp, pitch, dist_per_samp, src):
+    """
+    Loop version of the reconstruction, meant to be compiled with numba.
+    Unlike the vectorized version, this does not build a (mic, y, x) array of delays.
+    """
+    reconst_img = np.zeros((Nmics, Nsamp))
+
+    # Columns of the image are independent of each other, so they can be done in parallel
+    for x in prange(Nsamp):
+        for y in range(Nmics):
+            pt = (dist_per_samp * x, pitch * (y - Nmics / 2 + 0.5))
+
+            for mic_ind in range(mic_x.shape[0]):
+                mic = (mic_x[mic_ind], mic_y[mic_ind])
+                t_delay = np.int64(np.rint(dist(src, pt, mic) / dist_per_samp))
+                if t_delay < Nsamp:
+                    reconst_img[y, x] += mic_output[mic_ind, t_delay]
+
+    return reconst_img
+
+
+if njit is not None:
+    # No fastmath - it changes how the delays that fall exactly between samples are rounded
+    reconstruct = njit(parallel=True, cache=True)(reconstruct)
+
 mic_output = np.loadtxt("rx3.txt")
 Nmics, Nsamp = mic_output.shape
 
@@ -40,14 +80,33 @@ plt.imshow(mic_output, cmap="viridis")
 
 plt.show()
 
-reconst_img = np.zeros((Nmics, Nsamp))
-
-for x in range(Nsamp):
-    for y in range(Nmics):
-        for mic_ind, mic in enumerate(mics):
-            t_delay = round(dist(src, (dist_per_samp * x, pitch * (y - Nmics / 2 + 0.5)), mic) / dist_per_samp)
-            if t_delay < Nsamp:
-                reconst_img[y, x] += mic_output[mic_ind][t_delay]
+# Coordinates of the mics
+mic_x = np.array([mic[0] for mic in mics])
+mic_y = np.array([mic[1] for mic in mics])
+
+if njit is not None:
+    reconst_img = reconstruct(
+        mic_output, mic_x, mic_y, Nmics, Nsamp, pitch, dist_per_samp, src
+    )
+else:
+    # Coordinates of the reconstruction points
+    pt_x = dist_per_samp * np.arange(Nsamp)
+    pt_y = pitch * (np.arange(Nmics) - Nmics / 2 + 0.5)
+
+    # Distance from the source to every point - shape (y, x)
+    d1 = np.sqrt((src[1] - pt_y[:, None]) ** 2 + (src[0] - pt_x[None, :]) ** 2)
+    # Distance from every point to every mic - shape (mic, y, x)
+    d2 = np.sqrt(
+        (mic_y[:, None, None] - pt_y[None, :, None]) ** 2
+        + (mic_x[:, None, None] - pt_x[None, None, :]) ** 2
+    )
+
+    t_delay = np.rint((d1[None, :, :] + d2) / dist_per_samp).astype(np.int64)
+    in_range = t_delay < Nsamp
+
+    # Sum up the samples from every mic, ignoring delays beyond the recorded samples
+    samples = mic_output[np.arange(len(mics))[:, None, None], np.where(in_range, t_delay, 0)]
+    reconst_img = (samples * in_range).sum(axis=0)
 
 plt.imshow(reconst_img, cmap="viridis")
 plt.colorbar()
@@ -1,15 +1,24 @@
 import os
+import warnings
 
 from enum import Enum, auto
 from io import TextIOWrapper
 from dataclasses import dataclass
+from itertools import chain
 from collections import defaultdict
-from typing import List, Dict, Tuple, Set
+from typing import Callable, List, Dict, Tuple, Set
 
 import numpy as np
+from scipy.linalg import LinAlgWarning, lu_factor, lu_solve
+from scipy.sparse import coo_matrix, csc_matrix
+from scipy.sparse.linalg import splu
 
 TOL = 1e-200
 
+# Largest system that is solved as a dense matrix - below this,
+# the overhead of the sparse solver is larger than the savings
+DENSE_MAX_EQNS = 50
+
 
 class ElementType(Enum):
     """
@@ -22,7 +31,7 @@ class ElementType(Enum):
     R = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class Element:
     """
     Element dataclass to store connection information and value
@@ -33,21 +42,29 @@ class Element:
         value:  Resistance/Source value
         node_1: First node connection
         node_2: Second node connection
+        node_1_idx: Index of the first node, set once all nodes are read
+        node_2_idx: Index of the second node, set once all nodes are read
+        conductance: 1 / value for resistors
     """
 
     name: str
     element_type: ElementType
-    value: int
+    value: float
     node_1: str
     node_2: str
-
-
-# Dictionary to store parsing formats for different elements
-# Mapping of Element -> (Mapping of Parameter -> Token Index)
-PARAMETER_ORDERING = {
-    "R": {"name": 0, "value": 3, "node_1": 1, "node_2": 2},
-    "V": {"name": 0, "value": 4, "node_1": 1, "node_2": 2, "source_type": 3},
-    "I": {"name": 0, "value": 4, "node_1": 1, "node_2": 2, "source_type": 3},
+    node_1_idx: int = -1
+    node_2_idx: int = -1
+    conductance: float = 0.0
+
+
+# Parsing formats for the different elements
+# Mapping of Element -> (Element type, and the token indexes of
+# name, value, node_1, node_2, source_type)
+# Resistors do not have a source type, so its index is -1
+PARAM_TABLE = {
+    "R": (ElementType.R, 0, 3, 1, 2, -1),
+    "V": (ElementType.V, 0, 4, 1, 2, 3),
+    "I": (ElementType.I, 0, 4, 1, 2, 3),
 }
 
 
@@ -56,17 +73,19 @@ class Circuit:
     Circuit class to simulate a given circuit file
 
     Attributes:
-        nodes_set (Set[str]): Set of all nodes
+        node_order (Dict[str, None]): All nodes, in the order they first appear (an ordered set)
         nodes (Dict[str, int]): Dictionary mapping nodes to unique integer indexes
 
         voltage_sources (Dict[str, Tuple[Element, int]]): Dictionary mapping voltage source names
             to the Element object and unique integer index
         current_sources (Dict[str, Element]): Dictionary mapping current source names to Element object
         passive_elements (Dict[str, Element]): Dictionary mapping resistor names to Element object
+        _all_names (Set[str]): Names of all the elements added so far
 
         gnd_idx (int): Unique index for the GND node
 
-        eqns (np.array): Matrix containing circuit equations
+        A (csc_matrix): Sparse coefficient matrix of the circuit equations
+        b (np.array): Right hand side of the circuit equations
         voltage_solns (Dict[str, float]): Dictionary mapping nodes to their voltages
         current_solns (Dict[str, float]): Dictionary mapping voltage sources to their branch currents
 
@@ -76,15 +95,17 @@ class Circuit:
 
     def __init__(self) -> None:
         """Initialise matrix."""
-        self.nodes_set: Set = set()
+        self.node_order: Dict[str, None] = dict()
         self.nodes: Dict[str, int] = dict()
 
         self.voltage_sources: Dict[str, Tuple[Element, int]] = dict()
         self.current_sources: Dict[str, Element] = dict()
         self.passive_elements: Dict[str, Element] = dict()
+        self._all_names: Set[str] = set()
         self.gnd_idx = -1
 
-        self.eqns = np.zeros((0, 0))
+        self.A = csc_matrix((0, 0))
+        self.b = np.zeros((0,))
         self.voltage_solns: Dict[str, float] = dict()
         self.current_solns: Dict[str, float] = dict()
 
@@ -141,37 +162,33 @@ class Circuit:
             ValueError if a 0 valued resistance is provided
         """
         try:
-            float(value)
+            element_value = float(value)
         except ValueError:
             # The element value cannot be parsed into a float
             raise ValueError("Malformed circuit file")
 
-        if any(
-            name in elements_dict
-            for elements_dict in (
-                self.passive_elements,
-                self.voltage_sources,
-                self.current_sources,
-            )
-        ):
+        if name in self._all_names:
             # Element name has been repeated
             raise ValueError("Malformed circuit file")
 
-        self.nodes_set.add(node_1)
-        self.nodes_set.add(node_2)
-        element = Element(name, element_type, float(value), node_1, node_2)
+        self.node_order.setdefault(node_1, None)
+        self.node_order.setdefault(node_2, None)
+        element = Element(name, element_type, element_value, node_1, node_2)
 
         # Update the elements dicts
         if element_type == ElementType.R:
             if abs(element.value) <= TOL:
                 raise ValueError("Circuit error: 0 valued resistance")
             else:
+                element.conductance = 1.0 / element.value
                 self.passive_elements[name] = element
         elif element_type == ElementType.V:
             self.voltage_sources[name] = (element, self.num_voltage_sources)
         else:
             self.current_sources[name] = element
 
+        self._all_names.add(name)
+
     def read_circuit(self, circuit_file: TextIOWrapper) -> None:
         """
         Parse the circuit file
@@ -189,6 +206,7 @@ class Circuit:
             ValueError if the circuit contains both ac and dc sources
         """
         start_circuit = False
+        add_element = self.add_element
 
         for line in circuit_file:
             line = line.strip()
@@ -206,31 +224,40 @@ class Circuit:
 
             elif start_circuit and line:
                 # Remove comments and generate tokens
-                tokens = line.split("#")[0].strip().split()
+                # At most 5 tokens are used - anything after them is left unsplit
+                tokens = line.partition("#")[0].split(None, 5)
 
-                if tokens[0][0] not in PARAMETER_ORDERING:
+                param_spec = PARAM_TABLE.get(tokens[0][0])
+                if param_spec is None:
                     # Invalid element
                     raise ValueError("Only V, I, R elements are permitted")
 
                 # Parse tokens
+                (
+                    element_type,
+                    name_idx,
+                    value_idx,
+                    node_1_idx,
+                    node_2_idx,
+                    source_type_idx,
+                ) = param_spec
                 try:
-                    params = {
-                        key: tokens[idx]
-                        for key, idx in PARAMETER_ORDERING[tokens[0][0]].items()
-                    }
-                except:
+                    name, value = tokens[name_idx], tokens[value_idx]
+                    node_1, node_2 = tokens[node_1_idx], tokens[node_2_idx]
+                    source_type = tokens[source_type_idx] if source_type_idx >= 0 else None
+                except IndexError:
                     # Parameters are not provided correctly
                     raise ValueError("Malformed circuit file")
 
-                if params["name"][0] in ("V", "I"):
-                    if params["source_type"] not in ("ac", "dc"):
+                if source_type is not None:
+                    if source_type not in ("ac", "dc"):
                         raise ValueError("Malformed circuit file")
-                    elif params["source_type"] == "ac":
+                    elif source_type == "ac":
                         self.num_ac_sources += 1
                     else:
                         self.num_dc_sources += 1
 
-                self.add_element(element_type=ElementType[params["name"][0]], **params)
+                add_element(name, element_type, value, node_1, node_2, source_type)
         else:
             # Circuit was never ended
             raise ValueError("Malformed circuit file")
@@ -238,53 +265,99 @@ class Circuit:
         if all([self.num_ac_sources, self.num_dc_sources]):
             raise ValueError("Circuit error: mixed AC and DC sources")
 
-        # Read all nodes and generate unique indexes
-        for idx, node in enumerate(self.nodes_set):
-            self.nodes[node] = idx
-
-        # Store the ground node index
-        self.gnd_idx = self.nodes.get("GND", -1)
-        if self.gnd_idx == -1:
+        if "GND" not in self.node_order:
             # There is no GND node
             raise ValueError("Malformed circuit file")
 
-    def generate_eqns(self) -> None:
+        # Read all nodes and generate unique indexes
+        # The GND node always gets index 0, the other nodes follow in order
+        self.gnd_idx = 0
+        nodes = self.nodes = {"GND": self.gnd_idx}
+        for node in self.node_order:
+            if node != "GND":
+                nodes[node] = len(nodes)
+
+        # Resolve the node indexes of every element once
+        for element in chain(
+            self.passive_elements.values(),
+            self.current_sources.values(),
+            (element for element, _ in self.voltage_sources.values()),
+        ):
+            element.node_1_idx = nodes[element.node_1]
+            element.node_2_idx = nodes[element.node_2]
+
+    def generate_eqns(self, dtype: type = np.float64) -> None:
         """
-        Generate the equations to solve in an augmented matrix.
+        Generate the equations to solve as a sparse matrix A and a vector b.
 
          - For all resistors, a conductance matrix is generated.
-         - The currents through the current sources are added into the last
-           column of the augmented matrix.
+         - The currents through the current sources are added into b.
          - The voltage sources are assumed to have an unknown current
            through them. This is factored into the equations at each node.
          - The voltage difference across the source is treated as another equation.
+
+        Args:
+            dtype (type): Floating point type of A and b, and hence of the solve.
+                np.float32 halves the memory used, for well conditioned circuits.
         """
-        self.eqns = np.zeros((self.num_eqns, self.num_eqns + 1), dtype=np.float64)
+        num_eqns = self.num_eqns
+        gnd_idx = self.gnd_idx
+
+        # Flatten the elements into arrays of node indices and values,
+        # so that all the entries of a kind can be stamped at once
+        resistors = self.passive_elements.values()
+        count = len(resistors)
+        r_node_1 = np.fromiter((el.node_1_idx for el in resistors), np.int64, count)
+        r_node_2 = np.fromiter((el.node_2_idx for el in resistors), np.int64, count)
+        r_conductance = np.fromiter((el.conductance for el in resistors), np.float64, count)
+
+        sources = self.current_sources.values()
+        count = len(sources)
+        i_node_1 = np.fromiter((el.node_1_idx for el in sources), np.int64, count)
+        i_node_2 = np.fromiter((el.node_2_idx for el in sources), np.int64, count)
+        i_value = np.fromiter((el.value for el in sources), np.float64, count)
+
+        sources = self.voltage_sources.values()
+        count = len(sources)
+        v_node_1 = np.fromiter((el.node_1_idx for el, _ in sources), np.int64, count)
+        v_node_2 = np.fromiter((el.node_2_idx for el, _ in sources), np.int64, count)
+        v_value = np.fromiter((el.value for el, _ in sources), np.float64, count)
+        v_row = self.num_nodes + np.fromiter((idx for _, idx in sources), np.int64, count)
+
+        # The matrix is assembled from (row, col, value) triplets:
+        # 4 per resistor, 4 per voltage source, and the GND equation at the end
+        num_r, num_v = len(r_conductance), len(v_value)
+        num_triplets = 4 * num_r + 4 * num_v + 1
+        rows = np.empty((num_triplets,), dtype=np.int64)
+        cols = np.empty((num_triplets,), dtype=np.int64)
+        data = np.empty((num_triplets,), dtype=dtype)
+
+        # Views of the preallocated triplets, with one row per stamp
+        r_rows, r_cols, r_data = (
+            arr[: 4 * num_r].reshape(4, num_r) for arr in (rows, cols, data)
+        )
+        v_rows, v_cols, v_data = (
+            arr[4 * num_r : -1].reshape(4, num_v) for arr in (rows, cols, data)
+        )
 
         # Conductance matrix:
         # a_ij = -1/R_ij for i != j
         # a_ii = sum(1/R_ij) over all j
-        for element in self.passive_elements.values():
-            node_1_idx = self.nodes[element.node_1]
-            node_2_idx = self.nodes[element.node_2]
-
-            conductance = 1.0 / element.value
-
-            self.eqns[node_1_idx][node_1_idx] += conductance
-            self.eqns[node_1_idx][node_2_idx] -= conductance
-            self.eqns[node_2_idx][node_1_idx] -= conductance
-            self.eqns[node_2_idx][node_2_idx] += conductance
-
-        # Current column in the augmented matrix:
+        r_rows[0] = r_rows[1] = r_node_1
+        r_rows[2] = r_rows[3] = r_node_2
+        r_cols[0] = r_cols[2] = r_node_1
+        r_cols[1] = r_cols[3] = r_node_2
+        r_data[0] = r_data[3] = r_conductance
+        np.negative(r_conductance, out=r_data[1])
+        r_data[2] = r_data[1]
+
+        # Current vector:
         # Incoming current -> +ve
         # Outgoing current -> -ve
         # Current flows from node_1 to node_2
-        for element in self.current_sources.values():
-            node_1_idx = self.nodes[element.node_1]
-            node_2_idx = self.nodes[element.node_2]
-
-            self.eqns[node_1_idx][-1] -= element.value
-            self.eqns[node_2_idx][-1] += element.value
+        b = np.zeros((num_eqns,), dtype=dtype)
+        np.add.at(b, i_node_1, -i_value)
+        np.add.at(b, i_node_2, i_value)
 
         # Voltage source eqns in the matrix:
         # We take current through the branch to be another variable
@@ -292,24 +365,63 @@ class Circuit:
         # For the equation corresponding to that unknown current in the matrix
         # We write the difference of voltages at the two nodes to be equal
         # to the voltage source's value
-        for element, voltage_idx in self.voltage_sources.values():
-            node_1_idx = self.nodes[element.node_1]
-            node_2_idx = self.nodes[element.node_2]
-
-            # V_n1 - V_n2 = element.value
-            self.eqns[self.num_nodes + voltage_idx][node_1_idx] = 1.0
-            self.eqns[self.num_nodes + voltage_idx][node_2_idx] = -1.0
-            self.eqns[self.num_nodes + voltage_idx][-1] = element.value
-
-            # Add current coefficient into the eqns
-            # Current flows from node_2 to node_1
-            self.eqns[node_1_idx][self.num_nodes + voltage_idx] = 1.0
-            self.eqns[node_2_idx][self.num_nodes + voltage_idx] = -1.0
+        # V_n1 - V_n2 = element.value
+        v_rows[0] = v_rows[1] = v_row
+        v_cols[0], v_cols[1] = v_node_1, v_node_2
+        v_data[0], v_data[1] = 1.0, -1.0
+        b[v_row] = v_value
+
+        # Add current coefficient into the eqns
+        # Current flows from node_2 to node_1
+        v_rows[2], v_rows[3] = v_node_1, v_node_2
+        v_cols[2] = v_cols[3] = v_row
+        v_data[2], v_data[3] = 1.0, -1.0
 
         # GND node equation:
         # 1 x V_GND = 0
-        self.eqns[self.gnd_idx] = np.zeros((self.num_eqns + 1,))
-        self.eqns[self.gnd_idx][self.gnd_idx] = 1
+        # The diagonal entry goes last, and every other entry in the GND row is zeroed
+        rows[-1] = cols[-1] = gnd_idx
+        data[-1] = 1.0
+        data[:-1][rows[:-1] == gnd_idx] = 0.0
+        b[gnd_idx] = 0.0
+
+        # Every element only touches a handful of entries, so the matrix is
+        # assembled from (row, col, value) triplets - repeated entries are summed
+        self.A = coo_matrix((data, (rows, cols)), shape=(num_eqns, num_eqns)).tocsc()
+        self.A.eliminate_zeros()
+        self.b = b
+
+    def factorize(self) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        LU factorise the eqn matrix, so that it can be solved for several
+        right hand sides (like in a DC sweep) without factorising it again.
+
+        Returns:
+            Callable[[np.ndarray], np.ndarray]: Function returning the solution for a given b
+
+        Raises:
+            ValueError: If the circuit cannot be solved
+        """
+        if self.num_eqns <= DENSE_MAX_EQNS:
+            # The dense copy is already in the Fortran order LAPACK works in,
+            # and is only used here, so it can be factorised in place
+            # LAPACK only warns about a singular matrix
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", LinAlgWarning)
+                try:
+                    lu_piv = lu_factor(
+                        self.A.toarray(order="F"), overwrite_a=True, check_finite=False
+                    )
+                except LinAlgWarning:
+                    raise ValueError("Circuit error: no solution")
+
+            return lambda b: lu_solve(lu_piv, b, check_finite=False)
+
+        try:
+            return splu(self.A).solve
+        except RuntimeError:
+            # The matrix is singular
+            raise ValueError("Circuit error: no solution")
 
     def solve(self) -> None:
         """
@@ -319,30 +431,31 @@ class Circuit:
         Raises:
             ValueError: If the circuit cannot be solved
         """
-        A = self.eqns[:, :-1]
-        B = self.eqns[:, -1]
+        solns = self.factorize()(self.b)
 
-        # If the determinant is 0, then the matrix is singular and can't be solved
-        if abs(np.linalg.det(A)) <= TOL:
+        if not np.all(np.isfinite(solns)):
             raise ValueError("Circuit error: no solution")
 
-        solns = np.linalg.inv(A) @ B
+        # Branch currents are stored after the node voltages
+        solns = solns.tolist()
+        num_nodes = self.num_nodes
 
         self.voltage_solns = {node: solns[idx] for node, idx in self.nodes.items()}
 
         self.current_solns = {
-            element.name: solns[self.num_nodes + idx]
+            element.name: solns[num_nodes + idx]
             for element, idx in self.voltage_sources.values()
         }
 
 
-def evalSpice(filename: str):
+def evalSpice(filename: str, dtype: type = np.float64):
     """
     Given a circuit file, parse it and solve for the voltage at each node
     and the current in each branch.
 
     Args:
         filename (str): Circuit file
+        dtype (type): Floating point type to solve the circuit in, see `Circuit.generate_eqns()`
 
     Raises:
         FileNotFoundError if the circuit file does not exist
@@ -355,7 +468,7 @@ def evalSpice(filename: str):
     with open(filename, "r") as circuit_file:
         circuit.read_circuit(circuit_file)
 
-    circuit.generate_eqns()
+    circuit.generate_eqns(dtype)
     circuit.solve()
 
     return (circuit.voltage_solns, circuit.current_solns)
@@ -3,7 +3,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 import pytest
 import ast
-from evalSpice import evalSpice
+import numpy as np
+from evalSpice import evalSpice, Circuit, DENSE_MAX_EQNS
 
 # Path to the test data folder - end with / 
 testdata = "./testdata/"
@@ -63,3 +64,59 @@ def test_spice(inFile, expFile):
     """Test with various input combinations."""
     (Vout, Iout) = evalSpice(testdata + inFile)
     assert checkdiff(Vout, Iout, expFile) <= 0.001
+
+def read_circuit(inFile):
+    """Parse a circuit file and generate its equations."""
+    circuit = Circuit()
+    with open(testdata + inFile) as f:
+        circuit.read_circuit(f)
+    circuit.generate_eqns()
+    return circuit
+
+def test_sparse_solve():
+    """Circuits with more than DENSE_MAX_EQNS equations are solved as sparse matrices."""
+    assert read_circuit("test_ladder.ckt").num_eqns > DENSE_MAX_EQNS
+    (Vout, Iout) = evalSpice(testdata + "test_ladder.ckt")
+    assert checkdiff(Vout, Iout, "test_ladder.exp") <= 0.001
+
+def test_sparse_voltage_loop():
+    assert read_circuit("test_v_loop_ladder.ckt").num_eqns > DENSE_MAX_EQNS
+    with pytest.raises(ValueError) as exc_info:
+        evalSpice(testdata + "test_v_loop_ladder.ckt")
+    assert str(exc_info.value) == 'Circuit error: no solution'
+
+def solution_vector(circuit):
+    """Put the solutions from Circuit.solve() back in the order of the unknowns."""
+    solns = np.zeros(circuit.num_eqns)
+    for node, idx in circuit.nodes.items():
+        solns[idx] = circuit.voltage_solns[node]
+    for element, idx in circuit.voltage_sources.values():
+        solns[circuit.num_nodes + idx] = circuit.current_solns[element.name]
+    return solns
+
+@pytest.mark.parametrize("inFile, sparse", [("test_2.ckt", False), ("test_ladder.ckt", True)])
+def test_factorize(inFile, sparse):
+    """A factorised circuit can be solved for several right hand sides."""
+    circuit = read_circuit(inFile)
+    assert (circuit.num_eqns > DENSE_MAX_EQNS) == sparse
+
+    solve = circuit.factorize()
+    b_1 = circuit.b.copy()
+    b_2 = np.random.default_rng(0).uniform(-10, 10, circuit.num_eqns)
+    x_1, x_2 = solve(b_1), solve(b_2)
+
+    for b, x in ((b_1, x_1), (b_2, x_2)):
+        circuit.b = b
+        circuit.solve()
+        assert np.allclose(x, solution_vector(circuit), rtol=1e-9, atol=1e-9)
+
+@pytest.mark.parametrize("inFile, expFile", testparams)
+def test_spice_float32(inFile, expFile):
+    """Single precision solutions stay close to the expected values."""
+    (Vout, Iout) = evalSpice(testdata + inFile, dtype=np.float32)
+    assert checkdiff(Vout, Iout, expFile) <= 1e-4
+
+def test_voltage_loop_float32():
+    with pytest.raises(ValueError) as exc_info:
+        evalSpice(testdata + "test_v_loop.ckt", dtype=np.float32)
+    assert str(exc_info.value) == 'Circuit error: no solution'
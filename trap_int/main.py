@@ -1,33 +1,64 @@
 from trap_py import py_trapz
 from trap_np import np_trapz
 
+try:
+    from trap_nb import nb_trapz
+except ImportError:
+    # Numba is optional - without it, the nb implementation is not benchmarked
+    nb_trapz = None
+
+try:
+    from trap_cy import cy_trapz, SqFunction, SinFunction
+except ImportError:
+    # The Cython implementation has to be built first, see setup.py
+    cy_trapz = None
+
 import numpy as np
 
+import math
 import timeit
 import argparse
-import setuptools
 from typing import Callable, Dict
 
 def f_sq(x: float) -> float:
-    return x ** 2
+    return x * x
 
 def f_sin(x: float) -> float:
-    return np.sin(x)
+    return math.sin(x)
 
 IMPLEMENTATIONS = {
     "np": np_trapz,
     "py": py_trapz
 }
 
+if nb_trapz is not None:
+    IMPLEMENTATIONS["nb"] = nb_trapz
+
+# Math functions for each implementation
+# NumPy gets ufuncs that work on the whole array, numba gets functions it can compile,
+# and pure Python gets math.sin directly instead of np.sin on a scalar
 FUNCTIONS = {
-    "sq": f_sq,
-    "sin": f_sin
+    "sq": {
+        "np": f_sq,
+        "py": f_sq,
+        "nb": f_sq
+    },
+    "sin": {
+        "np": np.sin,
+        "py": math.sin,
+        "nb": f_sin
+    }
 }
 
+if cy_trapz is not None:
+    IMPLEMENTATIONS["cy"] = cy_trapz
+    FUNCTIONS["sq"]["cy"] = SqFunction()
+    FUNCTIONS["sin"]["cy"] = SinFunction()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         prog="python main.py",
-        description="Benchmark trapezoidal integration across pure Python, Cython, and NumPy."
+        description="Benchmark trapezoidal integration across pure Python, Cython, NumPy, and Numba."
     )
 
     parser.add_argument(
@@ -48,16 +79,22 @@ if __name__ == "__main__":
     args = parser.parse_args()
     
     for f_name in args.f:
-        func = FUNCTIONS[f_name]
         print(f"Benchmarking for function {f_name}():")
         for impl_name in args.i:
             implementation = IMPLEMENTATIONS[impl_name]
+            func = FUNCTIONS[f_name][impl_name]
+
+            # Run once before timing, so that any JIT compilation is not benchmarked
+            implementation(func, 1, 2, 1000)
 
+            # The setup binds impl and f as locals of the timing loop,
+            # so they are not looked up in the globals on every iteration
             timer = timeit.Timer(
                 f"impl(f, {1}, {2}, {1000})",
+                setup="impl, f = _impl, _f",
                 globals={
-                    "impl": implementation,
-                    "f": func
+                    "_impl": implementation,
+                    "_f": func
                 }
             )
 
@@ -0,0 +1,9 @@
+"""
+Build the Cython implementation of the trapezoidal rule:
+$ python setup.py build_ext --inplace
+"""
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(ext_modules=cythonize("trap_cy.pyx"))
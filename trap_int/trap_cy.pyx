@@ -0,0 +1,39 @@
+# cython: language_level=3
+# cython: infer_types=True
+# cython: cdivision=True
+# cython: boundscheck=False
+# cython: wraparound=False
+
+from libc.math cimport sin
+
+# Define each math function as a C class
+# Specify that they do not require the GIL
+# Removes the need for Python interpreter to handle the function call
+
+cdef class Function:
+    cdef double evaluate(self, double x) noexcept nogil:
+        return 0
+
+cdef class SqFunction(Function):
+    cdef double evaluate(self, double x) noexcept nogil:
+        return x * x
+
+cdef class SinFunction(Function):
+    cdef double evaluate(self, double x) noexcept nogil:
+        return sin(x)
+
+# f is typed as a Function instead of a Python Callable
+cpdef double cy_trapz(Function f, double a, double b, int n):
+    """Cython implementation of the trapezoidal rule"""
+    cdef double step_size = (b - a) / n
+    cdef double area
+
+    cdef int i
+
+    # The end points are counted once, every other point twice
+    with nogil:
+        area = 0.5 * (f.evaluate(a) + f.evaluate(b))
+        for i in range(1, n):
+            area += f.evaluate(a + i * step_size)
+
+    return area * step_size
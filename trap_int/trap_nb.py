@@ -0,0 +1,34 @@
+from numba import njit
+
+from typing import Callable, Dict
+
+# Compiled versions of the math functions that have been integrated so far
+_COMPILED_FUNCTIONS: Dict[Callable, Callable] = {}
+
+
+# Not cached - numba can not reuse a cached kernel that takes a compiled function
+# as an argument, so every run would compile it again and add another cache file
+@njit
+def _nb_trapz(f: Callable[[float], float], a: float, b: float, n: int) -> float:
+    """Numba kernel - f has to be a numba compiled function"""
+    step_size = (b - a) / n
+
+    # The end points are counted once, every other point twice
+    area = 0.5 * (f(a) + f(b))
+    for i in range(1, n):
+        area += f(a + i * step_size)
+
+    return area * step_size
+
+
+def nb_trapz(f: Callable[[float], float], a: float, b: float, n: int) -> float:
+    """
+    Numba implementation of the trapezoidal rule.
+    f is compiled with numba the first time it is integrated, so it must be a function
+    numba can compile. The kernel itself is compiled on its first call as well.
+    """
+    f_nb = _COMPILED_FUNCTIONS.get(f)
+    if f_nb is None:
+        f_nb = _COMPILED_FUNCTIONS[f] = njit(f)
+
+    return _nb_trapz(f_nb, a, b, n)